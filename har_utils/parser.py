@@ -32,7 +32,8 @@ def load_har_file(har_path: Path) -> dict:
         raise FileNotFoundError(f"HAR file not found: {har_path}")
 
     try:
-        with open(har_path, 'r', encoding='utf-8') as f:
+        # 1MB buffer: HAR files are often tens to hundreds of MB
+        with open(har_path, 'rb', buffering=1 << 20) as f:
             data = json.load(f)
 
         if 'log' not in data or 'entries' not in data['log']:
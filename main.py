@@ -2,14 +2,26 @@ from browser_use import Agent, ChatOpenAI, BrowserSession
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 import asyncio
+import functools
+import hashlib
+import io
+import multiprocessing
 import os
-import json
+import re
 import argparse
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional
+from urllib.parse import urldefrag
 import logging
+import ijson
+import orjson
+from ijson.common import ObjectBuilder
+import zstandard
 
 load_dotenv()
 
@@ -19,6 +31,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Large buffers cut read/write syscalls on multi-MB HAR files
+_HAR_BUFFER_SIZE = 1 << 20
+
+# Browser-internal requests dropped from the HAR; compiled into one anchored
+# alternation so adding prefixes keeps the per-entry check a single match
+_NOISE_PREFIXES = ('chrome-extension://', 'chrome://', 'about:')
+_NOISE_RE = re.compile('|'.join(map(re.escape, _NOISE_PREFIXES)))
+
+# Response types counted as JSON/script payloads in HAR stats
+_SCRIPT_MIME_PREFIXES = (
+    'application/json',
+    'application/javascript',
+    'application/x-javascript',
+    'text/javascript',
+)
+
 
 # ============================================================================
 # CONFIGURATION
@@ -30,8 +58,10 @@ class ScraperConfig:
     CDP_PORT = 9222
     VIEWPORT_WIDTH = 1280
     VIEWPORT_HEIGHT = 720
+    COMPRESS_HAR = False
+    ARCHIVE_HTML = False
 
-    CHROME_ARGS = [
+    CHROME_ARGS: tuple[str, ...] = (
         '--remote-debugging-port=9222',
         '--disable-blink-features=AutomationControlled',
         '--disable-extensions',
@@ -41,14 +71,21 @@ class ScraperConfig:
         '--disable-sync',
         '--no-default-browser-check',
         '--no-first-run',
-    ]
+    )
 
     MAX_AGENT_STEPS = 50
     MAX_FAILURES = 5
+    MAX_PARALLEL_PAGES = 4
     LLM_MODEL = "grok-4-fast-non-reasoning"
     LLM_TEMPERATURE = 0.7
 
 
+@functools.lru_cache(maxsize=1)
+def _xai_api_key() -> Optional[str]:
+    """Read XAI_API_KEY once (after load_dotenv) for reuse across scrapes."""
+    return os.getenv("XAI_API_KEY")
+
+
 class DummyOutput(BaseModel):
     """Dummy output for agent."""
     status: str = Field(default="completed", description="Task status")
@@ -66,8 +103,24 @@ def load_website_config(config_path: str) -> dict:
         create_example_config()
         return None
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(config_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+async def dump_json(path: Path, obj) -> None:
+    """Serialize obj with orjson and write it without blocking the event loop."""
+    data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    await asyncio.to_thread(Path(path).write_bytes, data)
+
+
+async def save_storage_state(context, storage_state_path: Path) -> None:
+    """Save context storage state (authentication) to disk."""
+    try:
+        storage_state = await context.storage_state()
+        await dump_json(storage_state_path, storage_state)
+        logger.info(f"Authentication saved to {storage_state_path}")
+    except Exception as e:
+        logger.warning(f"Could not save auth state: {e}")
 
 
 def create_example_config():
@@ -104,12 +157,12 @@ def create_example_config():
 
     # Save both templates
     with_login_path = templates_dir / 'with_login_template.json'
-    with open(with_login_path, 'w', encoding='utf-8') as f:
-        json.dump(with_login, f, indent=2)
+    with open(with_login_path, 'wb') as f:
+        f.write(orjson.dumps(with_login, option=orjson.OPT_INDENT_2))
 
     without_login_path = templates_dir / 'without_login_template.json'
-    with open(without_login_path, 'w', encoding='utf-8') as f:
-        json.dump(without_login, f, indent=2)
+    with open(without_login_path, 'wb') as f:
+        f.write(orjson.dumps(without_login, option=orjson.OPT_INDENT_2))
 
     logger.info(f"✅ Created templates:")
     logger.info(f"   - {with_login_path} (with authentication)")
@@ -135,91 +188,184 @@ def fix_storage_state_cookies(storage_state: dict) -> dict:
     return storage_state
 
 
-def clean_har_file(har_path: Path) -> tuple[int, int]:
-    """Remove noise from HAR file."""
-    with open(har_path, 'r', encoding='utf-8') as f:
-        har_data = json.load(f)
-
-    original_count = len(har_data.get('log', {}).get('entries', []))
-    filtered_entries = []
-
-    for entry in har_data.get('log', {}).get('entries', []):
-        url = entry.get('request', {}).get('url', '')
-        if any(url.startswith(prefix) for prefix in ['chrome-extension://', 'chrome://', 'about:']):
-            continue
-        filtered_entries.append(entry)
-
-    har_data['log']['entries'] = filtered_entries
-    with open(har_path, 'w', encoding='utf-8') as f:
-        json.dump(har_data, f, indent=2)
+def clean_and_validate_har(har_path: Path) -> tuple[int, int, dict]:
+    """
+    Remove noise from HAR file and validate it has response bodies.
 
-    return original_count, len(filtered_entries)
+    Streams entries one at a time with ijson, so the HAR is read once and never
+    held in memory as a whole. Kept entries are written to a temp file that
+    atomically replaces the original.
 
+    Returns:
+        Tuple of (original entry count, kept entry count, stats dict)
+    """
+    temp_path = har_path.with_name(har_path.name + '.tmp')
+    original_count = 0
+    filtered_count = 0
+    with_response_body = 0
+    with_json_response = 0
+    total_response_size = 0
+    log_fields = {}
+    field_builder = None
+    entry_builder = None
 
-def validate_har_completeness(har_path: Path) -> dict:
-    """Validate HAR file has response bodies."""
-    with open(har_path, 'r', encoding='utf-8') as f:
-        har_data = json.load(f)
+    try:
+        with open(har_path, 'rb', buffering=_HAR_BUFFER_SIZE) as src, \
+                open(temp_path, 'wb', buffering=_HAR_BUFFER_SIZE) as dst:
+            dst.write(b'{"log":{"entries":[')
+
+            for prefix, event, value in ijson.parse(src, use_float=True):
+                if prefix.startswith('log.entries.item'):
+                    if prefix == 'log.entries.item' and event == 'start_map':
+                        entry_builder = ObjectBuilder()
+                    entry_builder.event(event, value)
+                    if prefix != 'log.entries.item' or event != 'end_map':
+                        continue
+
+                    entry = entry_builder.value
+                    original_count += 1
+                    url = entry.get('request', {}).get('url', '')
+                    if _NOISE_RE.match(url):
+                        continue
+
+                    if filtered_count:
+                        dst.write(b',')
+                    dst.write(orjson.dumps(entry))
+                    filtered_count += 1
+
+                    content = entry.get('response', {}).get('content', {})
+                    text = content.get('text', '')
+
+                    if text:
+                        with_response_body += 1
+                        total_response_size += len(text)
+                        mime_type = content.get('mimeType', '').lower()
+                        if mime_type.startswith(_SCRIPT_MIME_PREFIXES) or '+json' in mime_type:
+                            with_json_response += 1
+
+                # Other log fields (version, creator, pages, ...) are small; rebuild them whole
+                elif prefix == 'log' and event == 'map_key':
+                    field_builder = None if value == 'entries' else ObjectBuilder()
+                    if field_builder:
+                        log_fields[value] = field_builder
+                elif field_builder and prefix.startswith('log.'):
+                    field_builder.event(event, value)
+
+            dst.write(b']')
+            for key, builder in log_fields.items():
+                dst.write(b',' + orjson.dumps(key) + b':' + orjson.dumps(builder.value))
+            dst.write(b'}}')
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
 
-    entries = har_data.get('log', {}).get('entries', [])
+    os.replace(temp_path, har_path)
     stats = {
-        'total_entries': len(entries),
-        'with_response_body': 0,
-        'with_json_response': 0,
-        'total_response_size': 0,
+        'total_entries': filtered_count,
+        'with_response_body': with_response_body,
+        'with_json_response': with_json_response,
+        'total_response_size': total_response_size,
     }
+    return original_count, filtered_count, stats
 
-    for entry in entries:
-        response = entry.get('response', {})
-        content = response.get('content', {})
-        mime_type = content.get('mimeType', '')
-        text = content.get('text', '')
 
-        if text:
-            stats['with_response_body'] += 1
-            stats['total_response_size'] += len(text)
-            if 'json' in mime_type.lower() or 'javascript' in mime_type.lower():
-                stats['with_json_response'] += 1
-
-    return stats
+def compress_har_file(har_path: Path) -> Path:
+    """Compress HAR file to .har.zst and remove the original."""
+    compressed_path = har_path.with_suffix('.har.zst')
+    with open(har_path, 'rb', buffering=_HAR_BUFFER_SIZE) as src, \
+            open(compressed_path, 'wb', buffering=_HAR_BUFFER_SIZE) as dst:
+        zstandard.ZstdCompressor(level=9).copy_stream(src, dst)
+    har_path.unlink()
+    return compressed_path
 
 
 class HTMLCapture:
     """Captures HTML for every page navigation."""
 
-    def __init__(self, output_dir: Path):
+    _URL_TRANS = str.maketrans({'/': '_', '?': '_', '&': '_', ':': '_'})
+
+    def __init__(self, output_dir: Path, archive: bool = False):
         self.output_dir = output_dir
         self.page_counter = 0
-        self.captured_urls = set()
+        self.files: list[Path] = []
+        self._seen: set[int] = set()
+        self._last_digest: Optional[bytes] = None
+
+        # Optionally stream every page into one pages.tar.zst instead of one file each
+        self.archive_path = output_dir / "pages.tar.zst" if archive else None
+        self._tar = None
+        if self.archive_path:
+            self._zstd_writer = zstandard.ZstdCompressor(level=3).stream_writer(open(self.archive_path, 'wb'))
+            self._tar = tarfile.open(fileobj=self._zstd_writer, mode='w|')
+            self._tar_lock = asyncio.Lock()
 
     async def capture_page(self, page, url: str):
         """Capture HTML from a page."""
-        if url in self.captured_urls:
+        # Dedupe on a fixed-size hash of the URL without its fragment
+        key = hash(urldefrag(url).url)
+        if key in self._seen:
             return
 
-        self.captured_urls.add(url)
-        self.page_counter += 1
+        self._seen.add(key)
 
         try:
             html_content = await page.content()
-            safe_url = url.replace('://', '_').replace('/', '_').replace('?', '_').replace('&', '_')[:80]
+            data = html_content.encode('utf-8')
+
+            # SPA route changes often re-render the same HTML as the previous capture;
+            # only that back-to-back repeat is skipped, so pages elsewhere are never lost
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            if digest == self._last_digest:
+                logger.info(f"Skipped HTML identical to the previous capture for {url}")
+                return None
+            self._last_digest = digest
+
+            self.page_counter += 1
+            safe_url = url.translate(self._URL_TRANS)[:80]
             filename = f"page_{self.page_counter}_{safe_url}.html"
             file_path = self.output_dir / filename
 
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            if self._tar:
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                async with self._tar_lock:
+                    await asyncio.to_thread(self._tar.addfile, info, io.BytesIO(data))
+            else:
+                await asyncio.to_thread(file_path.write_bytes, data)
 
+            self.files.append(file_path)
             logger.info(f"Captured HTML: {filename}")
             return file_path
         except Exception as e:
             logger.warning(f"Failed to capture HTML for {url}: {e}")
             return None
 
+    def close(self):
+        """Finish the HTML archive, if one is being written."""
+        if self._tar:
+            self._tar.close()
+            self._zstd_writer.close()
+            self._tar = None
+
 
 # ============================================================================
 # MAIN SCRAPER
 # ============================================================================
 
+async def scrape_url(context, url: str, sem: asyncio.Semaphore, html_capture: HTMLCapture):
+    """Load a URL in its own page of the shared context and capture its HTML."""
+    async with sem:
+        page = await context.new_page()
+        try:
+            await page.goto(url)
+            await html_capture.capture_page(page, page.url)
+        except Exception as e:
+            logger.warning(f"Failed to scrape {url}: {e}")
+        finally:
+            await page.close()
+
+
 async def scrape_website(config: dict):
     """
     Scrape any website based on configuration.
@@ -236,8 +382,11 @@ async def scrape_website(config: dict):
     output_dir = Path(f"{ScraperConfig.OUTPUT_BASE_DIR}/{website_name}_{timestamp}").resolve()
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    # Materialize output paths once and reuse them throughout the run
     har_file_path = output_dir / "requests.har"
-    has_saved_auth = Path(storage_state_file).exists() if needs_login else False
+    cookies_file = output_dir / "cookies.json"
+    storage_state_path = Path(storage_state_file)
+    has_saved_auth = storage_state_path.exists() if needs_login else False
 
     # Get credentials if needed
     credentials = {}
@@ -247,8 +396,8 @@ async def scrape_website(config: dict):
         password_var = creds_config.get('password_env_var')
 
         if email_var and password_var:
-            email = os.getenv(email_var)
-            password = os.getenv(password_var)
+            email = os.environ.get(email_var)
+            password = os.environ.get(password_var)
 
             if not email or not password:
                 logger.error(f"Missing credentials! Set {email_var} and {password_var} in .env file")
@@ -268,7 +417,7 @@ async def scrape_website(config: dict):
     playwright_instance = None
     browser = None
     context = None
-    html_capture = HTMLCapture(output_dir)
+    html_capture = HTMLCapture(output_dir, archive=ScraperConfig.ARCHIVE_HTML)
 
     try:
         # ====================================================================
@@ -278,14 +427,14 @@ async def scrape_website(config: dict):
         playwright_instance = await async_playwright().start()
 
         # Use stealth args if enabled
-        chrome_args = ScraperConfig.CHROME_ARGS.copy()
+        chrome_args = ScraperConfig.CHROME_ARGS
         if use_stealth:
             # Add extra stealth arguments
-            chrome_args.extend([
+            chrome_args += (
                 '--disable-web-security',
                 '--disable-features=IsolateOrigins,site-per-process',
                 '--disable-site-isolation-trials',
-            ])
+            )
 
         browser = await playwright_instance.chromium.launch(
             headless=False,
@@ -323,21 +472,18 @@ async def scrape_website(config: dict):
         # Load authentication if available
         if has_saved_auth:
             logger.info("Loading saved authentication...")
-            with open(storage_state_file, 'r') as f:
-                storage_state = json.load(f)
+            with open(storage_state_path, 'rb') as f:
+                storage_state = orjson.loads(f.read())
             storage_state = fix_storage_state_cookies(storage_state)
-            temp_storage_file = output_dir / "temp_storage_state.json"
-            with open(temp_storage_file, 'w') as f:
-                json.dump(storage_state, f, indent=2)
-            context_options["storage_state"] = str(temp_storage_file)
+            context_options["storage_state"] = storage_state
 
         context = await browser.new_context(**context_options)
 
         page = await context.new_page()
 
-        # Inject stealth JavaScript if stealth mode enabled
+        # Inject stealth JavaScript if stealth mode enabled (applies to every page in the context)
         if use_stealth:
-            await page.add_init_script("""
+            await context.add_init_script("""
                 // Hide webdriver property
                 Object.defineProperty(navigator, 'webdriver', {
                     get: () => undefined
@@ -398,7 +544,7 @@ async def scrape_website(config: dict):
 
         llm = ChatOpenAI(
             model=ScraperConfig.LLM_MODEL,
-            api_key=os.getenv("XAI_API_KEY"),
+            api_key=_xai_api_key(),
             base_url="https://api.x.ai/v1",
             temperature=ScraperConfig.LLM_TEMPERATURE,
             frequency_penalty=None,
@@ -433,54 +579,64 @@ async def scrape_website(config: dict):
 
         logger.info("Agent execution completed")
 
+        # Capture extra URLs in parallel pages of the same (HAR-recording) context
+        extra_urls = config.get('extra_urls', [])
+        if extra_urls:
+            logger.info(f"Capturing {len(extra_urls)} extra URLs...")
+            sem = asyncio.Semaphore(ScraperConfig.MAX_PARALLEL_PAGES)
+            await asyncio.gather(*(scrape_url(context, url, sem, html_capture) for url in extra_urls))
+
         # ====================================================================
         # STEP 4: Save Authentication State
         # ====================================================================
+        # Runs concurrently with cookie extraction; awaited before context closes
+        storage_task = None
         if needs_login and not has_saved_auth:
             logger.info("Saving authentication state...")
-            try:
-                storage_state = await context.storage_state()
-                with open(storage_state_file, 'w', encoding='utf-8') as f:
-                    json.dump(storage_state, f, indent=2)
-                logger.info(f"Authentication saved to {storage_state_file}")
-            except Exception as e:
-                logger.warning(f"Could not save auth state: {e}")
+            storage_task = asyncio.create_task(save_storage_state(context, storage_state_path))
 
         # ====================================================================
         # STEP 5: Save Cookies
         # ====================================================================
         logger.info("Extracting cookies...")
         all_cookies = await context.cookies()
-        cookies_file = output_dir / "cookies.json"
-        with open(cookies_file, 'w', encoding='utf-8') as f:
-            json.dump(all_cookies, f, indent=2)
+        await dump_json(cookies_file, all_cookies)
         logger.info(f"Saved {len(all_cookies)} cookies")
 
         # ====================================================================
         # STEP 6: Capture Final Page HTML
         # ====================================================================
         logger.info("Capturing final page HTML...")
-        if page.url not in html_capture.captured_urls:
-            await html_capture.capture_page(page, page.url)
+        await html_capture.capture_page(page, page.url)
 
         # ====================================================================
         # STEP 7: Finalize HAR File
         # ====================================================================
         logger.info("Finalizing HAR file...")
+        if storage_task:
+            await storage_task
         await context.close()
-        await browser.close()
-        await asyncio.sleep(1)
 
-        # Clean HAR
-        logger.info("Cleaning HAR file...")
-        original_count, filtered_count = clean_har_file(har_file_path)
+        # The HAR is written once the context closes; clean and validate it (CPU-bound
+        # JSON work) in a worker process while the browser and Playwright shut down.
+        # Spawned rather than forked, since this process already runs asyncio and threads.
+        logger.info("Cleaning and validating HAR file...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as har_pool:
+            har_future = asyncio.get_running_loop().run_in_executor(
+                har_pool, clean_and_validate_har, har_file_path
+            )
+            await browser.close()
+            await playwright_instance.stop()
+            playwright_instance = None
+
+            original_count, filtered_count, har_stats = await har_future
         removed = original_count - filtered_count
         if removed > 0:
             logger.info(f"Removed {removed} noise entries")
 
-        # Validate HAR
-        logger.info("Validating HAR completeness...")
-        har_stats = validate_har_completeness(har_file_path)
+        if ScraperConfig.COMPRESS_HAR:
+            logger.info("Compressing HAR file...")
+            har_file_path = compress_har_file(har_file_path)
 
         # ====================================================================
         # SUMMARY
@@ -503,21 +659,24 @@ async def scrape_website(config: dict):
             print("📦 HAR File: ⚠️  NOT CREATED")
 
         print()
-        print(f"🍪 Cookies: {len(all_cookies)} cookies saved → cookies.json")
+        print(f"🍪 Cookies: {len(all_cookies)} cookies saved → {cookies_file.name}")
         print()
 
         # HTML files
         print(f"📄 HTML Files: {html_capture.page_counter} pages captured")
-        for i in range(1, html_capture.page_counter + 1):
-            html_files = list(output_dir.glob(f"page_{i}_*.html"))
-            if html_files:
-                print(f"   {i}. {html_files[0].name}")
+        if html_capture.archive_path:
+            print(f"   Archived in: {html_capture.archive_path.name}")
+        for i, html_file in enumerate(html_capture.files, 1):
+            print(f"   {i}. {html_file.name}")
 
         print("="*70)
         print("\n🎉 SUCCESS! Captured:")
-        print("   ✅ 1x cookies.json")
-        print("   ✅ 1x requests.har")
-        print(f"   ✅ {html_capture.page_counter}x page_*.html")
+        print(f"   ✅ 1x {cookies_file.name}")
+        print(f"   ✅ 1x {har_file_path.name}")
+        if html_capture.archive_path:
+            print(f"   ✅ {html_capture.page_counter}x page_*.html in {html_capture.archive_path.name}")
+        else:
+            print(f"   ✅ {html_capture.page_counter}x page_*.html")
         print()
 
     except Exception as e:
@@ -528,6 +687,8 @@ async def scrape_website(config: dict):
         # Cleanup
         logger.info("Cleaning up resources...")
 
+        html_capture.close()
+
         if context:
             try:
                 if not context._impl_obj._is_closed_or_closing:
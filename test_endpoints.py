@@ -10,131 +10,233 @@ Usage:
 """
 
 import argparse
-import json
+import asyncio
+import hashlib
+import itertools
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from http.cookiejar import Cookie, CookieJar
 from pathlib import Path
-import requests
-from typing import Dict, List, Optional
+import httpx
+import ijson
+import orjson
+from tqdm import tqdm
+from typing import Dict, Iterable, Iterator, List, Optional
 from urllib.parse import urlparse, parse_qs, urlencode
 import time
 
+# uvloop is optional (Linux/macOS only); asyncio's default loop is used without it
+try:
+    import uvloop
+    _LOOP_FACTORY = uvloop.new_event_loop
+except ImportError:
+    _LOOP_FACTORY = None
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Default bytes of each response body kept in the results file (--body-preview-bytes)
+RESPONSE_PREVIEW_BYTES = 2048
+
+# JSON bodies up to this size are read whole and parsed; larger ones are only previewed
+JSON_PARSE_MAX_BYTES = 5 * 1024 * 1024
+
+# Retry policy for connection failures and gateway errors. 503 is left to the
+# per-host backoff below, which honours Retry-After instead of retrying at once.
+# Only idempotent methods are retried: a gateway error doesn't mean a POST wasn't applied.
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.3
+_RETRY_STATUSES = frozenset({502, 504})
+_RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Per-host delay adapts to the server: halved after a 2xx, doubled (or Retry-After) when throttled
+MIN_HOST_DELAY_SECONDS = 0.1
+MAX_HOST_DELAY_SECONDS = 60.0
+_THROTTLE_STATUSES = frozenset({429, 503})
+
+# --batch-mode: JSON-RPC calls to the same URL are sent together, up to this many per batch
+BATCH_MAX_REQUESTS = 50
+
+# Idle connections kept open for reuse; HTTP/2 hosts multiplex over a single one
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+_METHOD_ALLOWED = frozenset({'GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS'})
+_METHOD_WITH_BODY = frozenset({'POST', 'PUT', 'PATCH'})
+
+# Successful results of idempotent requests are reused across runs for this long
+CACHE_EXPIRE_SECONDS = 3600
+_CACHEABLE_METHODS = frozenset({'GET', 'HEAD'})
+
 
 # ============================================================================
 # COOKIE CONVERSION
 # ============================================================================
 
-def load_cookies_for_requests(cookies_path: Path) -> Dict[str, requests.cookies.RequestsCookieJar]:
+def make_cookie(cookie: dict) -> Cookie:
+    """
+    Convert a Playwright cookie dict to an http.cookiejar Cookie.
+
+    Args:
+        cookie: Cookie dict from cookies.json
+
+    Returns:
+        Cookie keeping domain, path and secure attributes
+    """
+    domain = cookie.get('domain', '')
+    path = cookie.get('path', '/')
+    return Cookie(
+        version=0,
+        name=cookie.get('name', ''),
+        value=cookie.get('value', ''),
+        port=None,
+        port_specified=False,
+        domain=domain,
+        domain_specified=True,
+        domain_initial_dot=domain.startswith('.'),
+        path=path,
+        path_specified=bool(path),
+        secure=cookie.get('secure', False),
+        expires=None,
+        discard=True,
+        comment=None,
+        comment_url=None,
+        rest={},
+    )
+
+
+def load_cookies(cookies_path: Path) -> CookieJar:
     """
-    Load cookies from JSON and organize by domain for requests library.
+    Load cookies from JSON into a single jar for the HTTP client.
+
+    Each cookie keeps its domain, path and secure attributes, so the client
+    picks the matching cookies for every URL at send time.
 
     Args:
         cookies_path: Path to cookies.json
 
     Returns:
-        Dict mapping domain to RequestsCookieJar
+        CookieJar with all cookies
     """
+    jar = CookieJar()
+
     if not cookies_path.exists():
         logger.warning(f"Cookies file not found: {cookies_path}")
-        return {}
-
-    with open(cookies_path, 'r', encoding='utf-8') as f:
-        cookies = json.load(f)
+        return jar
 
-    # Organize cookies by domain
-    cookies_by_domain = {}
+    with open(cookies_path, 'rb') as f:
+        cookies = orjson.loads(f.read())
 
     for cookie in cookies:
-        domain = cookie.get('domain', '')
-        if not domain:
+        if not cookie.get('domain'):
             continue
+        jar.set_cookie(make_cookie(cookie))
 
-        # Clean domain (remove leading dot)
-        clean_domain = domain.lstrip('.')
+    logger.info(f"Loaded {len(jar)} cookies")
+    return jar
 
-        if clean_domain not in cookies_by_domain:
-            cookies_by_domain[clean_domain] = requests.cookies.RequestsCookieJar()
 
-        # Add cookie to jar
-        cookies_by_domain[clean_domain].set(
-            name=cookie.get('name', ''),
-            value=cookie.get('value', ''),
-            domain=domain,
-            path=cookie.get('path', '/'),
-            secure=cookie.get('secure', False),
-        )
+def session_fingerprint(cookie_jar: CookieJar) -> bytes:
+    """
+    Digest the jar's cookies so cached responses are only reused for the same session.
+
+    Args:
+        cookie_jar: Jar with all captured cookies
+
+    Returns:
+        16-byte digest of every cookie's domain, path, name and value
+    """
+    cookies = sorted((c.domain, c.path, c.name, c.value or '') for c in cookie_jar)
+    return hashlib.blake2b(orjson.dumps(cookies), digest_size=16).digest()
 
-    logger.info(f"Loaded cookies for {len(cookies_by_domain)} domains")
-    return cookies_by_domain
 
+# ============================================================================
+# ENDPOINT LOADING
+# ============================================================================
 
-def get_cookies_for_url(url: str, cookies_by_domain: Dict) -> requests.cookies.RequestsCookieJar:
+def iter_endpoints(endpoints_path: Path) -> Iterator[dict]:
     """
-    Get appropriate cookies for a URL.
+    Stream endpoints from api_endpoints.json one at a time.
 
     Args:
-        url: Target URL
-        cookies_by_domain: Cookie jars organized by domain
+        endpoints_path: Path to api_endpoints.json
 
-    Returns:
-        RequestsCookieJar with relevant cookies
+    Yields:
+        Endpoint dicts, in file order
     """
-    parsed = urlparse(url)
-    hostname = parsed.hostname or ''
+    with open(endpoints_path, 'rb') as f:
+        yield from ijson.items(f, 'endpoints.item', use_float=True)
+
 
-    # Try exact domain match first
-    if hostname in cookies_by_domain:
-        return cookies_by_domain[hostname]
+def read_website_name(endpoints_path: Path) -> str:
+    """
+    Read the top-level website_name without loading the endpoint list.
 
-    # Try subdomain match (e.g., api.example.com matches example.com)
-    # Must be exact match or proper subdomain (with dot separator)
-    for domain, jar in cookies_by_domain.items():
-        if hostname == domain or hostname.endswith('.' + domain):
-            return jar
+    Args:
+        endpoints_path: Path to api_endpoints.json
 
-    # Return empty jar
-    return requests.cookies.RequestsCookieJar()
+    Returns:
+        Website name, or 'unknown' if missing
+    """
+    with open(endpoints_path, 'rb') as f:
+        return next(ijson.items(f, 'website_name'), 'unknown')
 
 
 # ============================================================================
 # ENDPOINT TESTING
 # ============================================================================
 
-def test_endpoint(endpoint: dict, cookies_by_domain: Dict, timeout: int = 10) -> dict:
+def create_client(cookie_jar: CookieJar, timeout: int, pool_size: int) -> httpx.AsyncClient:
     """
-    Test a single API endpoint and capture response.
+    Create a shared HTTP/2 client so endpoint tests multiplex over pooled connections.
 
     Args:
-        endpoint: Endpoint dict from api_endpoints.json
-        cookies_by_domain: Cookies organized by domain
+        cookie_jar: Jar with all captured cookies
         timeout: Request timeout in seconds
+        pool_size: Maximum open connections
 
     Returns:
-        Dict with test results
+        Configured httpx AsyncClient
     """
-    method = endpoint.get('method', 'GET')
-    url = endpoint.get('full_url', '')
-    endpoint_name = endpoint.get('endpoint_name', 'Unknown')
+    # No explicit transport, so HTTP(S)_PROXY / NO_PROXY from the environment still apply.
+    # Connection failures and gateway errors are retried in test_endpoint.
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=min(pool_size, MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=30.0,
+        ),
+        cookies=cookie_jar,
+        timeout=timeout,
+        follow_redirects=True,
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json, text/html, */*',
+        },
+    )
 
-    logger.info(f"Testing: {method} {url}")
 
-    # Get cookies for this URL
-    cookies = get_cookies_for_url(url, cookies_by_domain)
+def split_parameters(endpoint: dict) -> tuple:
+    """
+    Sort an endpoint's parameters into query, body and header values.
 
-    # Prepare headers
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'application/json, text/html, */*',
-    }
+    Args:
+        endpoint: Endpoint dict from api_endpoints.json
 
-    # Add required headers from endpoint
-    required_headers = endpoint.get('required_headers', {})
-    headers.update(required_headers)
+    Returns:
+        Tuple of (query_params, body_params or None, headers)
+    """
+    # Add required headers from endpoint (defaults are set on the client)
+    headers = dict(endpoint.get('required_headers', {}))
 
     # Prepare parameters
     query_params = {}
@@ -154,90 +256,139 @@ def test_endpoint(endpoint: dict, cookies_by_domain: Dict, timeout: int = 10) ->
         elif location == 'header':
             headers[name] = value
 
+    return query_params, body_params, headers
+
+
+def build_request(endpoint: dict, client: httpx.AsyncClient) -> httpx.Request:
+    """
+    Build the request for an endpoint once, so retries resend it without rebuilding.
+
+    Args:
+        endpoint: Endpoint dict from api_endpoints.json
+        client: Shared client whose default headers and cookies are merged in
+
+    Returns:
+        Request ready for client.send
+    """
+    method = endpoint.get('method', 'GET')
+    query_params, body_params, headers = split_parameters(endpoint)
+
+    request_method = method.upper()
+    if request_method not in _METHOD_ALLOWED:
+        # Default to GET for unknown methods
+        logger.warning(f"Unknown HTTP method '{method}', defaulting to GET")
+        request_method = 'GET'
+
+    request_kwargs = {
+        'params': query_params,
+        'headers': headers,
+    }
+    if body_params is not None and request_method in _METHOD_WITH_BODY:
+        request_kwargs['json'] = body_params
+
+    return client.build_request(request_method, endpoint.get('full_url', ''), **request_kwargs)
+
+
+async def test_endpoint(
+    endpoint: dict,
+    client: httpx.AsyncClient,
+    timeout: int = 10,
+    preview_bytes: int = RESPONSE_PREVIEW_BYTES,
+) -> dict:
+    """
+    Test a single API endpoint and capture response.
+
+    Args:
+        endpoint: Endpoint dict from api_endpoints.json
+        client: Shared client used to send the request
+        timeout: Request timeout in seconds (for error reporting)
+        preview_bytes: Bytes of the response body kept in the result
+
+    Returns:
+        Dict with test results
+    """
+    method = endpoint.get('method', 'GET')
+    url = endpoint.get('full_url', '')
+    endpoint_name = endpoint.get('endpoint_name', 'Unknown')
+
+    logger.debug(f"Testing: {method} {url}")
+
     try:
+        request = build_request(endpoint, client)
+        cookie_header = request.headers.get('Cookie', '')
+
         # Make request
-        start_time = time.time()
-
-        if method.upper() == 'GET':
-            response = requests.get(
-                url,
-                params=query_params,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                allow_redirects=True
-            )
-        elif method.upper() == 'POST':
-            post_kwargs = {
-                'params': query_params,
-                'headers': headers,
-                'cookies': cookies,
-                'timeout': timeout,
-                'allow_redirects': True
-            }
-            if body_params is not None:
-                post_kwargs['json'] = body_params
-            response = requests.post(url, **post_kwargs)
-        elif method.upper() == 'PUT':
-            put_kwargs = {
-                'params': query_params,
-                'headers': headers,
-                'cookies': cookies,
-                'timeout': timeout,
-                'allow_redirects': True
-            }
-            if body_params is not None:
-                put_kwargs['json'] = body_params
-            response = requests.put(url, **put_kwargs)
-        elif method.upper() == 'DELETE':
-            response = requests.delete(
-                url,
-                params=query_params,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                allow_redirects=True
-            )
-        elif method.upper() == 'PATCH':
-            patch_kwargs = {
-                'params': query_params,
-                'headers': headers,
-                'cookies': cookies,
-                'timeout': timeout,
-                'allow_redirects': True
-            }
-            if body_params is not None:
-                patch_kwargs['json'] = body_params
-            response = requests.patch(url, **patch_kwargs)
-        else:
-            # Default to GET for unknown methods
-            logger.warning(f"Unknown HTTP method '{method}', defaulting to GET")
-            response = requests.get(
-                url,
-                params=query_params,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                allow_redirects=True
-            )
-
-        elapsed_ms = (time.time() - start_time) * 1000
-
-        # Parse response
-        content_type = response.headers.get('Content-Type', '')
-        response_text = response.text
+        start_ns = time.perf_counter_ns()
+        retries = MAX_RETRIES if request.method in _RETRY_METHODS else 0
+
+        # Stream the body only as far as needed: small JSON is read whole for parsing,
+        # anything else up to the preview size. Connection failures and gateway errors are
+        # retried with exponential backoff.
+        for attempt in range(retries + 1):
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.ConnectError:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            try:
+                if response.status_code in _RETRY_STATUSES and attempt < retries:
+                    await response.aclose()
+                    await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                    continue
+
+                content_type = response.headers.get('Content-Type', '')
+                content_length = int(response.headers.get('Content-Length') or 0)
+                is_json = (
+                    'application/json' in content_type
+                    and content_length <= JSON_PARSE_MAX_BYTES
+                )
+                # One byte past the limit tells a cut-off body from one that ends exactly there
+                read_limit = (JSON_PARSE_MAX_BYTES if is_json else preview_bytes) + 1
+
+                chunks = []
+                read = 0
+                complete = True
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    read += len(chunk)
+                    if read >= read_limit:
+                        complete = False
+                        break
+                body = b''.join(chunks)
+                # Bodies without Content-Length can still turn out too large to parse
+                is_json = is_json and read <= JSON_PARSE_MAX_BYTES
+
+                # Content-Length is only the real total for a body that isn't compressed;
+                # otherwise a cut-off body's total is unknown
+                encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+                if complete:
+                    response_size = read
+                elif content_length and not encoded:
+                    response_size = content_length
+                else:
+                    response_size = None
+            finally:
+                await response.aclose()
+            break
+
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
 
         # Try to parse JSON
         response_json = None
-        if 'application/json' in content_type:
+        if is_json:
             try:
-                response_json = response.json()
-            except:
+                response_json = orjson.loads(body)
+            except orjson.JSONDecodeError:
                 pass
 
         # Truncate large responses
-        if len(response_text) > 10000:
-            response_text_truncated = response_text[:10000] + f"\n... [truncated, total {len(response_text)} chars]"
+        response_text = body[:preview_bytes].decode(response.encoding or 'utf-8', errors='replace')
+        if response_size is None:
+            response_text_truncated = response_text + f"\n... [truncated, at least {read} bytes read]"
+        elif response_size > preview_bytes:
+            response_text_truncated = response_text + f"\n... [truncated, total {response_size} bytes]"
         else:
             response_text_truncated = response_text
 
@@ -249,17 +400,17 @@ def test_endpoint(endpoint: dict, cookies_by_domain: Dict, timeout: int = 10) ->
             'status': 'success' if response.status_code < 400 else 'error',
             'response_time_ms': round(elapsed_ms, 2),
             'content_type': content_type,
-            'response_size_bytes': len(response.content),
+            'response_size_bytes': response_size,
             'response_headers': dict(response.headers),
             'response_text': response_text_truncated,
             'response_json': response_json,
-            'cookies_used': len(cookies),
+            'cookies_used': cookie_header.count(';') + 1 if cookie_header else 0,
         }
 
-        logger.info(f"✓ {response.status_code} - {elapsed_ms:.0f}ms - {endpoint_name}")
+        logger.debug(f"✓ {response.status_code} - {elapsed_ms:.0f}ms - {endpoint_name}")
         return result
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error(f"✗ Timeout - {endpoint_name}")
         return {
             'endpoint_name': endpoint_name,
@@ -268,7 +419,7 @@ def test_endpoint(endpoint: dict, cookies_by_domain: Dict, timeout: int = 10) ->
             'status': 'timeout',
             'error': f'Request timeout after {timeout}s'
         }
-    except requests.exceptions.ConnectionError as e:
+    except httpx.TransportError as e:
         logger.error(f"✗ Connection Error - {endpoint_name}")
         return {
             'endpoint_name': endpoint_name,
@@ -288,10 +439,496 @@ def test_endpoint(endpoint: dict, cookies_by_domain: Dict, timeout: int = 10) ->
         }
 
 
+def jsonrpc_batch_key(endpoint: dict) -> Optional[bytes]:
+    """
+    Key JSON-RPC 2.0 calls that can share one batch request.
+
+    Args:
+        endpoint: Endpoint dict from api_endpoints.json
+
+    Returns:
+        Key shared by calls to the same URL with the same query and headers,
+        or None if the endpoint is not a JSON-RPC call
+    """
+    if endpoint.get('method', 'GET').upper() != 'POST':
+        return None
+
+    query_params, body_params, headers = split_parameters(endpoint)
+    if not body_params or body_params.get('jsonrpc') != '2.0' or 'method' not in body_params:
+        return None
+
+    signature = orjson.dumps(
+        [endpoint.get('full_url', ''), query_params, headers],
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.blake2b(signature, digest_size=16).digest()
+
+
+async def test_batch(
+    endpoints: List[dict],
+    client: httpx.AsyncClient,
+    preview_bytes: int = RESPONSE_PREVIEW_BYTES,
+) -> Optional[List[dict]]:
+    """
+    Send JSON-RPC calls as one batch request and split the reply per endpoint.
+
+    Args:
+        endpoints: JSON-RPC endpoints sharing a jsonrpc_batch_key
+        client: Shared client used to send the request
+        preview_bytes: Bytes of each reply kept in the result
+
+    Returns:
+        One result per endpoint in the same order, or None if the server did not
+        answer the batch properly and the calls should be sent one by one
+    """
+    query_params, _, headers = split_parameters(endpoints[0])
+    # Ids are replaced with positions so every reply can be matched to its call
+    bodies = [split_parameters(endpoint)[1] for endpoint in endpoints]
+    calls = [{**body, 'id': n} for n, body in enumerate(bodies)]
+
+    try:
+        request = client.build_request(
+            'POST', endpoints[0].get('full_url', ''), params=query_params, headers=headers, json=calls
+        )
+        start_ns = time.perf_counter_ns()
+        response = await client.send(request)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+    except httpx.HTTPError as e:
+        logger.debug(f"Batch of {len(endpoints)} failed: {e}")
+        return None
+
+    if response.status_code != 200:
+        return None
+    try:
+        replies = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(replies, list):
+        return None
+
+    # Only integer ids can be ours; anything else (including unhashable ids) means a bad reply
+    replies_by_id = {
+        reply['id']: reply
+        for reply in replies
+        if isinstance(reply, dict) and type(reply.get('id')) is int
+    }
+    if len(replies_by_id) != len(endpoints) or set(replies_by_id) != set(range(len(endpoints))):
+        return None
+
+    cookie_header = request.headers.get('Cookie', '')
+    response_headers = dict(response.headers)
+    results = []
+    for n, endpoint in enumerate(endpoints):
+        # Restore the call's own id so the reply reads as if it was sent alone
+        reply = {**replies_by_id[n], 'id': bodies[n].get('id')}
+        reply_bytes = orjson.dumps(reply)
+        response_text = reply_bytes[:preview_bytes].decode('utf-8', errors='replace')
+        if len(reply_bytes) > preview_bytes:
+            response_text += f"\n... [truncated, total {len(reply_bytes)} bytes]"
+
+        results.append({
+            'endpoint_name': endpoint.get('endpoint_name', 'Unknown'),
+            'method': endpoint.get('method', 'POST'),
+            'url': endpoint.get('full_url', ''),
+            'status_code': response.status_code,
+            'status': 'error' if 'error' in reply else 'success',
+            'response_time_ms': round(elapsed_ms, 2),
+            'content_type': response.headers.get('Content-Type', ''),
+            'response_size_bytes': len(reply_bytes),
+            'response_headers': response_headers,
+            'response_text': response_text,
+            'response_json': reply,
+            'cookies_used': cookie_header.count(';') + 1 if cookie_header else 0,
+            'batched': True,
+        })
+
+    logger.debug(f"✓ Batch of {len(endpoints)} - {elapsed_ms:.0f}ms - {endpoints[0].get('full_url', '')}")
+    return results
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+
+    Args:
+        value: Raw header value, if present
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def request_key(endpoint: dict) -> bytes:
+    """
+    Hash the request an endpoint sends, so aliases of the same request share one key.
+
+    Args:
+        endpoint: Endpoint dict from api_endpoints.json
+
+    Returns:
+        16-byte digest of method, URL, parameters and headers
+    """
+    signature = orjson.dumps(
+        [
+            endpoint.get('method', 'GET').upper(),
+            endpoint.get('full_url', ''),
+            endpoint.get('parameters', []),
+            endpoint.get('required_headers', {}),
+        ],
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.blake2b(signature, digest_size=16).digest()
+
+
+async def run_endpoint_tests(
+    endpoints: Iterable[dict],
+    cookie_jar: CookieJar,
+    args,
+    writer: 'ResultWriter',
+    cache: Optional['ResponseCache'] = None,
+) -> int:
+    """
+    Test endpoints concurrently over one shared client as they are read.
+
+    Args:
+        endpoints: Endpoint dicts, typically streamed from api_endpoints.json
+        cookie_jar: Jar with all captured cookies
+        args: Parsed CLI arguments (timeout, delay, concurrency)
+        writer: Receives each result as soon as it completes
+        cache: Results from earlier runs, reused instead of sending the request
+
+    Returns:
+        Number of endpoints tested, duplicates included
+    """
+    sem = asyncio.Semaphore(args.concurrency)
+    min_delay = min(args.delay, MIN_HOST_DELAY_SECONDS)
+
+    # Identical requests are sent once and their result is copied to every alias:
+    # aliases of an in-flight request wait in pending, later ones are read back from the writer
+    pending: Dict[bytes, List[dict]] = {}
+    written: Dict[bytes, int] = {}
+
+    def write_aliases(key: bytes, result: dict):
+        written[key] = writer.write(result)
+        for alias in pending.pop(key):
+            writer.write({**result, 'endpoint_name': alias.get('endpoint_name', 'Unknown')})
+
+    async def run_host(host_queue: asyncio.Queue):
+        delay = args.delay
+        next_fire = time.monotonic()
+
+        async def wait_turn():
+            wait = next_fire - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        def record(status_code: int, retry_after_header: Optional[str] = None):
+            nonlocal delay, next_fire
+            if 200 <= status_code < 300:
+                delay = max(min_delay, delay * 0.5)
+            elif status_code in _THROTTLE_STATUSES:
+                retry_after = retry_after_seconds(retry_after_header)
+                if retry_after is None:
+                    retry_after = max(delay, MIN_HOST_DELAY_SECONDS) * 2
+                delay = min(MAX_HOST_DELAY_SECONDS, retry_after)
+            next_fire = time.monotonic() + delay
+
+        # Each queue item is a list of (index, key, endpoint): several items form a JSON-RPC batch
+        while (items := await host_queue.get()) is not None:
+            if len(items) > 1:
+                await wait_turn()
+                async with sem:
+                    logger.debug(f"[{items[0][0]}] Testing batch of {len(items)}...")
+                    results = await test_batch(
+                        [endpoint for _, _, endpoint in items], client, preview_bytes=args.body_preview_bytes
+                    )
+
+                if results is not None:
+                    record(results[0]['status_code'])
+                    for (_, key, _), result in zip(items, results):
+                        write_aliases(key, result)
+                    continue
+
+                # Server didn't handle the batch, so send the calls one by one
+                logger.debug(f"[{items[0][0]}] Batch rejected, sending {len(items)} requests individually")
+                record(0)
+
+            for i, key, endpoint in items:
+                cacheable = cache is not None and endpoint.get('method', 'GET').upper() in _CACHEABLE_METHODS
+
+                cached = cache.get(key) if cacheable else None
+                if cached is not None:
+                    logger.debug(f"[{i}] Cached {endpoint.get('endpoint_name', 'Unknown')}")
+                    write_aliases(key, {
+                        **cached,
+                        'endpoint_name': endpoint.get('endpoint_name', 'Unknown'),
+                        'method': endpoint.get('method', 'GET'),
+                        'url': endpoint.get('full_url', ''),
+                        'from_cache': True,
+                    })
+                    continue
+
+                await wait_turn()
+                async with sem:
+                    logger.debug(f"[{i}] Testing {endpoint.get('endpoint_name', 'Unknown')}...")
+                    result = await test_endpoint(
+                        endpoint, client, timeout=args.timeout, preview_bytes=args.body_preview_bytes
+                    )
+
+                record(result.get('status_code') or 0, result.get('response_headers', {}).get('retry-after'))
+
+                if cacheable and result.get('status') == 'success':
+                    cache.put(key, result)
+                write_aliases(key, result)
+
+    # One bounded host_queue and worker per host: each host is worked through in order with
+    # the delay between its requests, while different hosts run in parallel
+    host_queues: Dict[str, asyncio.Queue] = {}
+    total = 0
+
+    # --batch-mode: JSON-RPC calls collected per (host, batch key) until a batch is full
+    batches: Dict[tuple, List[tuple]] = {}
+
+    # The task group cancels every worker if reading endpoints fails or the run is
+    # interrupted, and cancels the reader if a worker fails, so nothing is left waiting
+    async with create_client(cookie_jar, args.timeout, args.concurrency) as client, \
+            asyncio.TaskGroup() as workers:
+
+        async def enqueue(host: str, items: List[tuple]):
+            host_queue = host_queues.get(host)
+            if host_queue is None:
+                host_queue = host_queues[host] = asyncio.Queue(maxsize=args.concurrency * 4)
+                workers.create_task(run_host(host_queue))
+            await host_queue.put(items)
+
+        for endpoint in endpoints:
+            total += 1
+            key = request_key(endpoint)
+            if key in written:
+                alias_result = writer.read(written[key])
+                writer.write({**alias_result, 'endpoint_name': endpoint.get('endpoint_name', 'Unknown')})
+                continue
+            if key in pending:
+                pending[key].append(endpoint)
+                continue
+            pending[key] = []
+
+            host = urlparse(endpoint.get('full_url', '')).netloc
+            batch_key = jsonrpc_batch_key(endpoint) if args.batch_mode else None
+            if batch_key is None:
+                await enqueue(host, [(total, key, endpoint)])
+                continue
+
+            batch = batches.setdefault((host, batch_key), [])
+            batch.append((total, key, endpoint))
+            if len(batch) >= BATCH_MAX_REQUESTS:
+                await enqueue(host, batches.pop((host, batch_key)))
+
+        for (host, _), batch in batches.items():
+            await enqueue(host, batch)
+
+        # Workers stop once their queue is drained
+        for host_queue in host_queues.values():
+            await host_queue.put(None)
+
+    duplicates = total - len(written)
+    if duplicates:
+        logger.info(
+            f"Skipped {duplicates} duplicate requests "
+            f"({duplicates / total * 100:.1f}%), sent {len(written)} unique"
+        )
+    return total
+
+
+# ============================================================================
+# RESULTS OUTPUT
+# ============================================================================
+
+class ResultWriter:
+    """Appends test results to a JSON Lines file as they complete."""
+
+    def __init__(self, jsonl_path: Path, sample_size: int = 3, progress: Optional[tqdm] = None):
+        self.jsonl_path = jsonl_path
+        self.sample_size = sample_size
+        self.progress = progress
+        self.status_counts = Counter()
+        self.samples = []
+        self._file = open(jsonl_path, 'w+b')
+
+    def write(self, result: dict) -> int:
+        """Persist one result, update the counters and return its offset in the file."""
+        offset = self._file.tell()
+        self._file.write(orjson.dumps(result) + b'\n')
+        self._file.flush()
+
+        # Every result carries a status: success, error, timeout or connection_error
+        status = result['status']
+        self.status_counts[status] += 1
+        if status == 'success' and len(self.samples) < self.sample_size:
+            self.samples.append(result)
+
+        if self.progress is not None:
+            self.progress.set_postfix(ok=self.success_count, err=self.error_count, refresh=False)
+            self.progress.update(1)
+        return offset
+
+    @property
+    def success_count(self) -> int:
+        return self.status_counts['success']
+
+    @property
+    def error_count(self) -> int:
+        return self.status_counts.total() - self.status_counts['success']
+
+    def read(self, offset: int) -> dict:
+        """Read back the result written at offset."""
+        self._file.seek(offset)
+        result = orjson.loads(self._file.readline())
+        self._file.seek(0, os.SEEK_END)
+        return result
+
+    def close(self):
+        self._file.close()
+
+
+class ResponseCache:
+    """Successful GET/HEAD results kept in a JSON Lines file and reused on the next run."""
+
+    def __init__(
+        self,
+        cache_path: Path,
+        session: bytes = b'',
+        expire_after: float = CACHE_EXPIRE_SECONDS,
+        refresh: bool = False,
+    ):
+        self.cache_path = cache_path
+        # Mixed into every key, so a different cookie session never replays these responses
+        self.session = session
+        self.expire_after = expire_after
+        # One timestamp for the whole run, used for both expiry and new entries
+        self.run_started = time.time()
+        self._entries: Dict[str, dict] = {}
+
+        if refresh or not cache_path.exists():
+            return
+
+        skipped = 0
+        with open(cache_path, 'rb') as f:
+            for line in f:
+                # A damaged line (e.g. from an interrupted write) only loses that entry
+                try:
+                    entry = orjson.loads(line)
+                    if self.run_started - entry['stored_at'] < expire_after:
+                        self._entries[entry['key']] = entry
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    skipped += 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} unreadable cache entries in {cache_path.name}")
+        logger.info(f"Loaded {len(self._entries)} cached responses from {cache_path.name}")
+
+    def _entry_key(self, key: bytes) -> str:
+        return hashlib.blake2b(key + self.session, digest_size=16).hexdigest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        entry = self._entries.get(self._entry_key(key))
+        return entry['result'] if entry else None
+
+    def put(self, key: bytes, result: dict):
+        entry_key = self._entry_key(key)
+        self._entries[entry_key] = {'key': entry_key, 'stored_at': self.run_started, 'result': result}
+
+    def save(self):
+        """Write the cache to a temp file that atomically replaces the old one."""
+        temp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                for entry in self._entries.values():
+                    f.write(orjson.dumps(entry) + b'\n')
+            os.replace(temp_path, self.cache_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+
+def write_results_file(results_path: Path, summary: dict, jsonl_path: Path):
+    """
+    Write the aggregated results JSON, streaming results back from the JSONL file.
+
+    Args:
+        results_path: Aggregated results file to create
+        summary: Summary fields written before the results array
+        jsonl_path: JSON Lines file written by ResultWriter
+    """
+    # Drop the closing "\n}" so the results array can be appended
+    header = orjson.dumps(summary, option=orjson.OPT_INDENT_2)[:-2]
+    with open(results_path, 'wb') as out, open(jsonl_path, 'rb') as lines:
+        out.write(header + b',\n  "results": [')
+        for i, line in enumerate(lines):
+            out.write((b',\n    ' if i else b'\n    ') + line.rstrip(b'\n'))
+        out.write(b'\n  ]\n}\n')
+
+
+# ============================================================================
+# PROGRESS DISPLAY
+# ============================================================================
+
+class TqdmLogHandler(logging.Handler):
+    """Prints log records above the progress bar instead of through it."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            tqdm.write(self.format(record), file=sys.stderr)
+        except Exception:
+            self.handleError(record)
+
+
+@contextmanager
+def queued_logging():
+    """
+    Hand log records to a listener thread while the progress bar is shown.
+
+    Tasks only enqueue records, so logging never blocks the event loop, and the
+    listener prints them with tqdm.write so they don't interleave with the bar.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+
+    console = TqdmLogHandler()
+    if handlers:
+        console.setFormatter(handlers[0].formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, console)
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    try:
+        yield
+    finally:
+        listener.stop()
+        root.handlers = handlers
+
+
 # ============================================================================
 # MAIN PIPELINE
 # ============================================================================
 
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Test discovered API endpoints with captured cookies',
@@ -318,7 +955,19 @@ Examples:
         '--delay',
         type=float,
         default=1.0,
-        help='Delay between requests in seconds (default: 1.0)'
+        help='Initial delay between requests to the same host in seconds, adapted to responses (default: 1.0)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=positive_int,
+        default=10,
+        help='Maximum requests in flight across all hosts (default: 10)'
+    )
+    parser.add_argument(
+        '--body-preview-bytes',
+        type=int,
+        default=RESPONSE_PREVIEW_BYTES,
+        help=f'Bytes of each response body kept in the results (default: {RESPONSE_PREVIEW_BYTES})'
     )
     parser.add_argument(
         '--output-file',
@@ -326,9 +975,40 @@ Examples:
         default='endpoint_test_results.json',
         help='Output filename (default: endpoint_test_results.json)'
     )
+    parser.add_argument(
+        '--batch-mode',
+        action='store_true',
+        help='Send JSON-RPC 2.0 calls to the same URL as one batch request'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Send every request, ignoring and not updating the response cache'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Ignore cached responses but store fresh ones for the next run'
+    )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Log every request and response instead of only the progress bar'
+    )
+    parser.add_argument(
+        '--summary-only',
+        action='store_true',
+        help='Only write the JSONL results and summary, skip the aggregated results file'
+    )
 
     args = parser.parse_args()
 
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    else:
+        # httpx logs every request at INFO
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+
     # Validate paths
     output_dir = Path(args.output_dir).resolve()
     if not output_dir.exists():
@@ -338,6 +1018,9 @@ Examples:
     endpoints_path = output_dir / "api_endpoints.json"
     cookies_path = output_dir / "cookies.json"
     results_path = output_dir / args.output_file
+    jsonl_path = results_path.with_suffix('.jsonl')
+    summary_path = results_path.with_name(f"{results_path.stem}_summary.json")
+    cache_path = output_dir / "http_cache.jsonl"
 
     if not endpoints_path.exists():
         logger.error(f"API endpoints file not found: {endpoints_path}")
@@ -354,83 +1037,87 @@ Examples:
 
     try:
         # Load API endpoints
-        logger.info("Step 1: Loading API endpoints...")
-        with open(endpoints_path, 'r', encoding='utf-8') as f:
-            api_data = json.load(f)
+        # Endpoints are streamed so testing starts before the whole file is parsed
+        logger.info("Step 1: Reading API endpoints...")
+        website_name = read_website_name(endpoints_path)
+        endpoints = iter_endpoints(endpoints_path)
 
-        endpoints = api_data.get('endpoints', [])
-        logger.info(f"Found {len(endpoints)} endpoints to test")
-
-        if len(endpoints) == 0:
+        first_endpoint = next(endpoints, None)
+        if first_endpoint is None:
             logger.warning("No endpoints to test")
             return 0
+        endpoints = itertools.chain([first_endpoint], endpoints)
 
         # Load cookies
         logger.info("\nStep 2: Loading cookies...")
-        cookies_by_domain = load_cookies_for_requests(cookies_path)
+        cookie_jar = load_cookies(cookies_path)
 
         # Test endpoints
-        logger.info(f"\nStep 3: Testing {len(endpoints)} endpoints...")
-        logger.info(f"Timeout: {args.timeout}s, Delay: {args.delay}s between requests\n")
-
-        results = []
-        success_count = 0
-        error_count = 0
-
-        for i, endpoint in enumerate(endpoints, 1):
-            logger.info(f"[{i}/{len(endpoints)}] Testing {endpoint.get('endpoint_name', 'Unknown')}...")
+        logger.info("\nStep 3: Testing endpoints...")
+        logger.info(f"Timeout: {args.timeout}s, Delay: {args.delay}s, Concurrency: {args.concurrency}\n")
 
-            result = test_endpoint(endpoint, cookies_by_domain, timeout=args.timeout)
-            results.append(result)
+        run_timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
 
-            if result.get('status') == 'success':
-                success_count += 1
-            else:
-                error_count += 1
-
-            # Delay between requests (be nice to servers)
-            if i < len(endpoints):
-                time.sleep(args.delay)
+        # Results are streamed to JSONL as they complete, so progress survives interruption
+        cache = None if args.no_cache else ResponseCache(
+            cache_path, session=session_fingerprint(cookie_jar), refresh=args.refresh
+        )
+        progress = tqdm(desc='Testing', unit='req')
+        writer = ResultWriter(jsonl_path, progress=progress)
+        try:
+            with queued_logging(), asyncio.Runner(loop_factory=_LOOP_FACTORY) as runner:
+                total_endpoints = runner.run(run_endpoint_tests(endpoints, cookie_jar, args, writer, cache))
+        finally:
+            progress.close()
+            writer.close()
+            if cache is not None:
+                cache.save()
+
+        success_count = writer.success_count
+        error_count = writer.error_count
 
         # Create summary
         logger.info("\nStep 4: Generating summary...")
 
         summary = {
-            'website_name': api_data.get('website_name', 'unknown'),
-            'test_timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
-            'total_endpoints': len(endpoints),
+            'website_name': website_name,
+            'test_timestamp': run_timestamp,
+            'total_endpoints': total_endpoints,
             'successful_requests': success_count,
             'failed_requests': error_count,
             'timeout_seconds': args.timeout,
             'delay_seconds': args.delay,
-            'results': results
+            'concurrency': args.concurrency,
         }
 
         # Save results
         logger.info("\nStep 5: Saving results...")
-        with open(results_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+        with open(summary_path, 'wb') as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+        if not args.summary_only:
+            write_results_file(results_path, summary, jsonl_path)
 
         # Summary
         print("\n" + "=" * 70)
         print("✅ ENDPOINT TESTING COMPLETE")
         print("=" * 70)
-        print(f"Total Endpoints: {len(endpoints)}")
-        print(f"Successful: {success_count} ({success_count/len(endpoints)*100:.1f}%)")
-        print(f"Failed: {error_count} ({error_count/len(endpoints)*100:.1f}%)")
-        print(f"\n💾 Results saved to: {results_path}")
+        print(f"Total Endpoints: {total_endpoints}")
+        print(f"Successful: {success_count} ({success_count/total_endpoints*100:.1f}%)")
+        print(f"Failed: {error_count} ({error_count/total_endpoints*100:.1f}%)")
+        print(f"\n💾 Results saved to: {jsonl_path}")
+        if not args.summary_only:
+            print(f"   Aggregated: {results_path}")
         print("=" * 70)
 
         # Show sample results
         if success_count > 0:
             print("\n📊 Sample Successful Responses:")
-            for result in results[:3]:
-                if result.get('status') == 'success':
-                    print(f"\n  • {result['endpoint_name']}")
-                    print(f"    {result['method']} {result['url']}")
-                    print(f"    Status: {result['status_code']} ({result['response_time_ms']}ms)")
-                    if result.get('response_json'):
-                        print(f"    Response: {str(result['response_json'])[:100]}...")
+            for result in writer.samples:
+                print(f"\n  • {result['endpoint_name']}")
+                print(f"    {result['method']} {result['url']}")
+                print(f"    Status: {result['status_code']} ({result['response_time_ms']}ms)")
+                if result.get('response_json'):
+                    print(f"    Response: {str(result['response_json'])[:100]}...")
 
         return 0
 